@@ -4,7 +4,6 @@ from logging import Logger
 from typing import Any, Dict, List, Tuple, Union
 
 import numpy as np
-import omegaconf
 from attr import dataclass
 from omegaconf import DictConfig, ListConfig, OmegaConf
 
@@ -363,7 +362,7 @@ class PyExperimenterCfg:
 
     @staticmethod
     def extract_config(config_path: str, logger: logging.Logger) -> "PyExperimenterCfg":
-        config = omegaconf.OmegaConf.load(config_path)
+        config = utils.load_yaml_config(config_path)
 
         if "n_jobs" not in config["PY_EXPERIMENTER"]:
             config["PY_EXPERIMENTER"]["n_jobs"] = 1
@@ -1,8 +1,6 @@
 import abc
 import logging
-from functools import reduce
-from operator import concat
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple, Union
 
 import pandas as pd
 
@@ -20,11 +18,18 @@ from py_experimenter.experiment_status import ExperimentStatus
 
 
 class DatabaseConnector(abc.ABC):
+    # Maximum number of rows written with a single batch of inserts, to stay below packet size limits
+    _bulk_insert_batch_size = 1000
+
     def __init__(self, database_configuration: DatabaseCfg, use_codecarbon: bool, logger: logging.Logger):
         self.logger = logger
         self.database_configuration = database_configuration
 
         self.use_codecarbon = use_codecarbon
+        # Columns of the experiment table, cached until the table is created or dropped by this connector
+        self._cached_columns: Optional[List[str]] = None
+        # SQL statements only depend on the fixed table configuration, so they are built once and reused
+        self._query_cache: Dict[Tuple, str] = dict()
         self._test_connection()
 
     @abc.abstractmethod
@@ -41,6 +46,11 @@ class DatabaseConnector(abc.ABC):
         except Exception as e:
             raise DatabaseConnectionError(f"error \n{e}\n raised when closing connection to database.")
 
+    def dispose(self) -> None:
+        """
+        Releases resources held by the connector for reuse, e.g., pooled connections. Nothing is released by default.
+        """
+
     def commit(self, connection) -> None:
         try:
             connection.commit()
@@ -58,6 +68,13 @@ class DatabaseConnector(abc.ABC):
         except Exception as e:
             raise DatabaseConnectionError(f"error \n{e}\n raised when executing sql statement.")
 
+    def executemany(self, cursor, sql_statement, values) -> None:
+        try:
+            self.logger.debug(f"Executing sql statement: {sql_statement} for {len(values)} sets of prepared statement values")
+            cursor.executemany(sql_statement, values)
+        except Exception as e:
+            raise DatabaseConnectionError(f"error \n{e}\n raised when executing sql statement.")
+
     def cursor(self, connection):
         try:
             return connection.cursor()
@@ -126,6 +143,7 @@ class DatabaseConnector(abc.ABC):
         return columns
 
     def _create_table(self, cursor, columns: List[Tuple["str"]], table_name: str, table_type: str = "standard"):
+        self._cached_columns = None
         query = self._get_create_table_query(columns, table_name, table_type)
         try:
             self.execute(cursor, query)
@@ -135,7 +153,7 @@ class DatabaseConnector(abc.ABC):
     def _get_create_table_query(self, columns: List[Tuple["str"]], table_name: str, table_type: str = "standard"):
         columns = ["%s %s DEFAULT NULL" % (field, datatype) for field, datatype in columns.items()]
         columns = ",".join(columns)
-        query = f"CREATE TABLE {table_name} (ID INTEGER PRIMARY KEY {self.get_autoincrement()}"
+        query = f"CREATE TABLE IF NOT EXISTS {table_name} (ID INTEGER PRIMARY KEY {self.get_autoincrement()}"
         if table_type == "standard":
             query += f", {columns}"
         elif table_type == "logtable":
@@ -150,9 +168,9 @@ class DatabaseConnector(abc.ABC):
     def get_autoincrement(self):
         pass
 
-    @abc.abstractmethod
-    def _table_has_correct_structure(self, cursor, typed_fields):
-        pass
+    def _table_has_correct_structure(self, cursor, typed_fields: Dict[str, str]) -> bool:
+        table_columns = self._exclude_fixed_columns(self.get_structure_from_table(cursor))
+        return set(table_columns) == set(typed_fields.keys())
 
     def fill_table(self, combinations) -> None:
         self.logger.debug("Fill table with parameters.")
@@ -169,7 +187,7 @@ class DatabaseConnector(abc.ABC):
         rows = []
         self.logger.debug("Checking which of the experiments to be inserted already exist.")
         for combination in combinations:
-            if self._check_combination_in_existing_rows(combination, existing_rows):
+            if self._check_combination_in_existing_rows(combination, existing_rows, column_names):
                 rows_skipped += 1
                 continue
             combination = self._add_metadata(combination, time)
@@ -183,8 +201,9 @@ class DatabaseConnector(abc.ABC):
             self.logger.info(f"No rows to add. All the {len(combinations)} experiments already exist.")
 
     def add_experiment(self, combination: Dict[str, str]) -> None:
-        existing_rows = self._get_existing_rows(list(self.database_configuration.keyfields.keys()))
-        if self._check_combination_in_existing_rows(combination, existing_rows):
+        column_names = list(self.database_configuration.keyfields.keys())
+        existing_rows = self._get_existing_rows(column_names)
+        if self._check_combination_in_existing_rows(combination, existing_rows, column_names):
             self.logger.info("Experiment already exists in database. Skipping.")
             return
 
@@ -203,8 +222,18 @@ class DatabaseConnector(abc.ABC):
             self.close_connection(connection)
         return experiment_id
 
+    def _get_cached_query(self, key: Tuple, build_query: Callable[[], str]) -> str:
+        query = self._query_cache.get(key)
+        if query is None:
+            query = self._query_cache[key] = build_query()
+        return query
+
     def _get_insert_query(self, table_name: str, columns: List[str]) -> str:
-        return f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join([self._prepared_statement_placeholder] * len(columns))})"
+        columns = tuple(columns)
+        return self._get_cached_query(
+            ("insert", table_name, columns),
+            lambda: f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({', '.join([self._prepared_statement_placeholder] * len(columns))})",
+        )
 
     @abc.abstractmethod
     def _last_insert_id_string(self) -> str:
@@ -220,14 +249,17 @@ class DatabaseConnector(abc.ABC):
         combination["status"] = status
         return combination
 
-    def _check_combination_in_existing_rows(self, combination, existing_rows) -> bool:
-        if combination in existing_rows:
-            return True
-        return False
+    def _check_combination_in_existing_rows(self, combination: Dict[str, Any], existing_rows: FrozenSet[Tuple], column_names: List[str]) -> bool:
+        try:
+            return tuple(combination[column_name] for column_name in column_names) in existing_rows
+        except KeyError:
+            return False
 
     @abc.abstractmethod
-    def _get_existing_rows(self, column_names) -> List[str]:
-        pass
+    def _get_existing_rows(self, column_names: List[str]) -> FrozenSet[Tuple]:
+        """
+        Returns the values of the given `column_names` of all rows in the table, each row as tuple ordered like `column_names`.
+        """
 
     def get_experiment_configuration(self, random_order: bool) -> Tuple[int, Dict[str, Any]]:
         try:
@@ -239,10 +271,34 @@ class DatabaseConnector(abc.ABC):
 
         return experiment_id, dict(zip([i[0] for i in description], *values))
 
+    def get_experiment_configurations(self, random_order: bool, batch_size: int) -> Tuple[List[int], Dict[str, List[Any]]]:
+        """
+        Pulls up to `batch_size` open experiments at once and sets their status to `running`.
+
+        :return: The ids of the pulled experiments and, for each keyfield, the list of its values ordered like the ids.
+        :raises NoExperimentsLeftException: If there are no open experiments left.
+        """
+        try:
+            experiment_ids, description, values = self._pull_open_experiments(random_order, batch_size)
+        except Exception as e:
+            raise DatabaseConnectionError(f"error \n {e} raised. \n Please check if fill_table() was called correctly.")
+
+        if not experiment_ids:
+            raise NoExperimentsLeftException("No experiments left to execute")
+
+        keyfield_names = [column[0] for column in description][1:]
+        keyfield_values_by_id = {row[0]: row[1:] for row in values}
+        rows = [keyfield_values_by_id[experiment_id] for experiment_id in experiment_ids]
+        return experiment_ids, {keyfield_name: [row[i] for row in rows] for i, keyfield_name in enumerate(keyfield_names)}
+
     @abc.abstractmethod
     def _pull_open_experiment(self, random_order) -> Tuple[int, List, List]:
         pass
 
+    @abc.abstractmethod
+    def _pull_open_experiments(self, random_order: bool, batch_size: int) -> Tuple[List[int], List, List]:
+        pass
+
     def _select_open_experiments_from_db(self, connection, cursor, random_order: bool) -> Tuple[int, List, List]:
         if random_order:
             order_by = self.random_order_string()
@@ -251,46 +307,89 @@ class DatabaseConnector(abc.ABC):
 
         time = utils.get_timestamp_representation()
 
-        self.execute(cursor, self._get_pull_experiment_query(order_by))
+        self.execute(cursor, self._get_cached_query(("pull", order_by, 1), lambda: self._get_pull_experiment_query(order_by)))
         experiment_id = self.fetchall(cursor)[0][0]
+        self.execute(cursor, self._get_start_experiment_query(), (ExperimentStatus.RUNNING.value, time, experiment_id))
+        self.execute(cursor, self._get_select_keyfields_query(), (experiment_id,))
+        values = self.fetchall(cursor)
+        self.commit(connection)
+        description = cursor.description
+        return experiment_id, description, values
+
+    def _select_open_experiment_batch_from_db(self, connection, cursor, random_order: bool, batch_size: int) -> Tuple[List[int], List, List]:
+        if random_order:
+            order_by = self.random_order_string()
+        else:
+            order_by = "id"
+
+        time = utils.get_timestamp_representation()
+
+        self.execute(
+            cursor,
+            self._get_cached_query(("pull", order_by, batch_size), lambda: self._get_pull_experiment_query(order_by, limit=batch_size)),
+        )
+        experiment_ids = [row[0] for row in self.fetchall(cursor)]
+        if not experiment_ids:
+            self.commit(connection)
+            return experiment_ids, None, []
+
+        id_placeholders = ", ".join([self._prepared_statement_placeholder] * len(experiment_ids))
         self.execute(
             cursor,
-            f"UPDATE {self.database_configuration.table_name} SET status = {self._prepared_statement_placeholder}, start_date = {self._prepared_statement_placeholder} WHERE id = {self._prepared_statement_placeholder};",
-            (ExperimentStatus.RUNNING.value, time, experiment_id),
+            f"UPDATE {self.database_configuration.table_name} SET status = {self._prepared_statement_placeholder}, start_date = {self._prepared_statement_placeholder} WHERE id IN ({id_placeholders});",
+            (ExperimentStatus.RUNNING.value, time, *experiment_ids),
         )
         keyfields = ",".join(list(self.database_configuration.keyfields.keys()))
-        self.execute(cursor, f"SELECT {keyfields} FROM {self.database_configuration.table_name} WHERE id = {experiment_id};")
+        self.execute(cursor, f"SELECT id,{keyfields} FROM {self.database_configuration.table_name} WHERE id IN ({id_placeholders});", experiment_ids)
         values = self.fetchall(cursor)
         self.commit(connection)
         description = cursor.description
-        return experiment_id, description, values
+        return experiment_ids, description, values
+
+    def _get_start_experiment_query(self) -> str:
+        return self._get_cached_query(
+            ("start_experiment",),
+            lambda: f"UPDATE {self.database_configuration.table_name} SET status = {self._prepared_statement_placeholder}, start_date = {self._prepared_statement_placeholder} WHERE id = {self._prepared_statement_placeholder};",
+        )
+
+    def _get_select_keyfields_query(self) -> str:
+        keyfields = ",".join(list(self.database_configuration.keyfields.keys()))
+        return self._get_cached_query(
+            ("select_keyfields",),
+            lambda: f"SELECT {keyfields} FROM {self.database_configuration.table_name} WHERE id = {self._prepared_statement_placeholder};",
+        )
 
     @abc.abstractstaticmethod
     def random_order_string():
         pass
 
     @abc.abstractmethod
-    def _get_pull_experiment_query(self, order_by: str):
-        return f"SELECT `id` FROM {self.database_configuration.table_name} WHERE status = 'created' ORDER BY {order_by} LIMIT 1"
+    def _get_pull_experiment_query(self, order_by: str, limit: int = 1):
+        return f"SELECT `id` FROM {self.database_configuration.table_name} WHERE status = 'created' ORDER BY {order_by} LIMIT {int(limit)}"
 
     def _write_to_database(self, combinations: List[Dict[str, str]]) -> None:
         columns = list(combinations[0].keys())
-        values = [list(combination.values()) for combination in combinations]
-        prepared_statement_palcehodler = ",".join([f"({', '.join([self._prepared_statement_placeholder] * len(columns))})"] * len(combinations))
-
-        stmt = f"INSERT INTO {self.database_configuration.table_name} ({','.join(columns)}) VALUES {prepared_statement_palcehodler}"
-        values = reduce(concat, values)
+        rows = [[combination[column] for column in columns] for combination in combinations]
         connection = self.connect()
         cursor = self.cursor(connection)
-        self.execute(cursor, stmt, values)
+        self._bulk_insert(cursor, self.database_configuration.table_name, columns, rows)
         self.commit(connection)
         self.close_connection(connection)
 
+    def _bulk_insert(self, cursor, table_name: str, columns: List[str], rows: List[List[Any]], batch_size: Optional[int] = None) -> None:
+        batch_size = batch_size or self._bulk_insert_batch_size
+        stmt = self._get_insert_query(table_name, columns)
+        for start in range(0, len(rows), batch_size):
+            self.executemany(cursor, stmt, rows[start : start + batch_size])
+
     def pull_paused_experiment(self, experiment_id: int) -> Dict[str, Any]:
         connnection = self.connect()
         cursor = self.cursor(connnection)
         keyfields = ",".join(list(self.database_configuration.keyfields.keys()))
-        query = f"SELECT {keyfields} FROM {self.database_configuration.table_name} WHERE id = {self._prepared_statement_placeholder} AND status = {self._prepared_statement_placeholder};"
+        query = self._get_cached_query(
+            ("select_paused_keyfields",),
+            lambda: f"SELECT {keyfields} FROM {self.database_configuration.table_name} WHERE id = {self._prepared_statement_placeholder} AND status = {self._prepared_statement_placeholder};",
+        )
         self.execute(cursor, query, (experiment_id, ExperimentStatus.PAUSED.value))
         keyfield_values = self.fetchall(cursor)
         if keyfield_values:
@@ -306,7 +405,7 @@ class DatabaseConnector(abc.ABC):
             raise NoPausedExperimentsException(f"There is no paused experiment with id {experiment_id} in the table.")
 
     def prepare_write_query(self, table_name: str, keys) -> str:
-        return f"INSERT INTO {table_name} ({', '.join(keys)}) VALUES ({','.join([self._prepared_statement_placeholder] * len(keys))})"
+        return self._get_insert_query(table_name, keys)
 
     def update_database(self, table_name: str, values: Dict[str, Union[str, int, object]], condition: str):
         connection = self.connect()
@@ -315,6 +414,20 @@ class DatabaseConnector(abc.ABC):
         self.commit(connection)
         self.close_connection(connection)
 
+    def update_experiments(self, table_name: str, experiment_ids: List[int], rows: List[Dict[str, Union[str, int, object]]]) -> None:
+        """
+        Updates multiple experiments at once, setting the values of `rows[i]` for the experiment `experiment_ids[i]`.
+        All `rows` have to contain the same keys.
+        """
+        columns = list(rows[0].keys())
+        query = self._prepare_update_query(table_name, columns, f"ID = {self._prepared_statement_placeholder}")
+        values = [[row[column] for column in columns] + [experiment_id] for experiment_id, row in zip(experiment_ids, rows)]
+        connection = self.connect()
+        cursor = self.cursor(connection)
+        self.executemany(cursor, query, values)
+        self.commit(connection)
+        self.close_connection(connection)
+
     def _prepare_update_query(self, table_name: str, values: Dict[str, Union[str, int, object]], condition: str) -> str:
         return f"UPDATE {table_name} SET {', '.join(f'{key} = {self._prepared_statement_placeholder}' for key in values)}" f" WHERE {condition}"
 
@@ -366,8 +479,13 @@ class DatabaseConnector(abc.ABC):
         self.commit(connection)
         self.close_connection(connection)
 
+    def get_structure_from_table(self, cursor) -> List[str]:
+        if self._cached_columns is None:
+            self._cached_columns = self._get_structure_from_table(cursor)
+        return list(self._cached_columns)
+
     @abc.abstractmethod
-    def get_structure_from_table(self, cursor):
+    def _get_structure_from_table(self, cursor) -> List[str]:
         pass
 
     def execute_queries(self, queries: List[str]):
@@ -378,7 +496,21 @@ class DatabaseConnector(abc.ABC):
         self.commit(connection)
         self.close_connection(connection)
 
+    def status_counts(self) -> Dict[str, int]:
+        """
+        Returns the number of experiments for each status occurring in the table.
+        """
+        connection = self.connect()
+        cursor = self.cursor(connection)
+        self.execute(cursor, f"SELECT status, COUNT(*) FROM {self.database_configuration.table_name} GROUP BY status")
+        counts = {status: count for status, count in self.fetchall(cursor)}
+        # End the read transaction, so that later counts on a reused connection see writes of other connections
+        self.commit(connection)
+        self.close_connection(connection)
+        return counts
+
     def delete_table(self) -> None:
+        self._cached_columns = None
         connection = self.connect()
         cursor = self.cursor(connection)
         for logtable_name in self.database_configuration.logtables.keys():
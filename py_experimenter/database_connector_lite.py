@@ -1,6 +1,6 @@
 import logging
 from sqlite3 import Error, connect
-from typing import Dict, Iterable, List, Tuple
+from typing import FrozenSet, List, Tuple
 
 from py_experimenter.database_connector import DatabaseConnector
 from py_experimenter.exceptions import DatabaseConnectionError
@@ -36,13 +36,27 @@ class DatabaseConnectorLITE(DatabaseConnector):
 
         return experiment_id, description, values
 
-    def _get_pull_experiment_query(self, order_by):
-        return super()._get_pull_experiment_query(order_by) + ";"
+    def _pull_open_experiments(self, random_order: bool, batch_size: int) -> Tuple[List[int], List, List]:
+        with connect(f"{self.database_configuration.database_name}.db") as connection:
+            try:
+                cursor = self.cursor(connection)
+                experiment_ids, description, values = self._select_open_experiment_batch_from_db(connection, cursor, random_order, batch_size)
+            except Exception as err:
+                connection.rollback()
+                raise err
+
+        return experiment_ids, description, values
+
+    def _get_pull_experiment_query(self, order_by, limit: int = 1):
+        return super()._get_pull_experiment_query(order_by, limit) + ";"
 
     def _table_exists(self, cursor) -> bool:
-        self.execute(cursor, f"SELECT name FROM sqlite_master WHERE type='table';")
-        table_names = self.fetchall(cursor)
-        return self.database_configuration.table_name in [x[0] for x in table_names]
+        self.execute(
+            cursor,
+            f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = {self._prepared_statement_placeholder} LIMIT 1;",
+            (self.database_configuration.table_name,),
+        )
+        return bool(self.fetchall(cursor))
 
     def _last_insert_id_string(self) -> str:
         return "last_insert_rowid()"
@@ -55,20 +69,16 @@ class DatabaseConnectorLITE(DatabaseConnector):
     def get_autoincrement():
         return "AUTOINCREMENT"
 
-    def _table_has_correct_structure(self, cursor, config_columns) -> List[str]:
-        self.execute(cursor, f"PRAGMA table_info({self.database_configuration.table_name})")
-        # Extracts columns from table
-        table_columns = self._exclude_fixed_columns([k[1] for k in self.fetchall(cursor)])
-        return set(table_columns) == set(config_columns.keys())
-
-    def _get_existing_rows(self, column_names: List[str]) -> List[Dict[str, str]]:
+    def _get_existing_rows(self, column_names: List[str]) -> FrozenSet[Tuple]:
         connection = self.connect()
         cursor = self.cursor(connection)
         self.execute(cursor, f"SELECT {','.join(column_names)} FROM {self.database_configuration.table_name}")
-        existing_rows = self.fetchall(cursor)
-        return [dict(zip(column_names, existing_row)) for existing_row in existing_rows]
+        # sqlite3 cursors fetch rows lazily while iterating
+        existing_rows = frozenset(cursor)
+        self.close_connection(connection)
+        return existing_rows
 
-    def get_structure_from_table(self, cursor):
+    def _get_structure_from_table(self, cursor) -> List[str]:
         def _get_column_names_from_entries(entries):
             return [entry[1] for entry in entries]
 
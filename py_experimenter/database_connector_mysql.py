@@ -1,12 +1,20 @@
+import atexit
 import logging
+import os
+import queue
+import threading
+import time
+import weakref
 from logging import Logger
-from typing import Dict, List, Tuple
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple, Union
 
 import numpy as np
 import sshtunnel
-from omegaconf import OmegaConf
 from pymysql import Error, connect
+from pymysql.cursors import SSCursor
 
+from py_experimenter import utils
 from py_experimenter.config import DatabaseCfg
 from py_experimenter.database_connector import DatabaseConnector
 from py_experimenter.exceptions import DatabaseConnectionError, DatabaseCreationError, SshTunnelError
@@ -15,15 +23,61 @@ from py_experimenter.exceptions import DatabaseConnectionError, DatabaseCreation
 class DatabaseConnectorMYSQL(DatabaseConnector):
     _prepared_statement_placeholder = "%s"
 
+    # SSH tunnels are shared between all connectors of a process that use the same credential file
+    _ssh_tunnels: "weakref.WeakValueDictionary[str, sshtunnel.SSHTunnelForwarder]" = weakref.WeakValueDictionary()
+    # Number of connectors holding each shared tunnel, a tunnel is only stopped once its last holder closes it
+    _ssh_tunnel_holders: Dict[str, int] = dict()
+    _ssh_tunnel_lock = threading.Lock()
+
+    # Seconds between checks whether the credential file has been modified
+    _credentials_check_interval = 30
+
+    # Idle connections are kept per process and database, so that they can be reused instead of reconnecting
+    _connection_pools: Dict[Tuple, queue.LifoQueue] = dict()
+    _connection_pool_lock = threading.Lock()
+    _connection_pool_size = 4
+    # Pool key of every checked out connection, so that it is returned to the pool it was taken from
+    _connection_pool_keys: Dict[int, Tuple] = dict()
+
     def __init__(self, database_configuration: DatabaseCfg, use_codecarbon: bool, credential_path: str, logger: Logger):
         self.credential_path = credential_path
+        self._tunnel = None
+        self._credentials = None
+        self._credentials_mtime = None
+        self._credentials_checked_at = None
         if database_configuration.use_ssh_tunnel:
             self.start_ssh_tunnel(logger)
         super().__init__(database_configuration, use_codecarbon, logger)
 
+    def __getstate__(self):
+        # SSH tunnels hold sockets and threads and cannot be pickled for worker processes
+        state = self.__dict__.copy()
+        state["_tunnel"] = None
+        # Credentials are reloaded from the credential file in each worker instead of being sent along
+        state["_credentials"] = None
+        state["_credentials_mtime"] = None
+        state["_credentials_checked_at"] = None
+        return state
+
     def get_ssh_tunnel(self, logger: Logger):
+        if self._tunnel is not None:
+            return self._tunnel
+
+        with self._ssh_tunnel_lock:
+            tunnel_key = os.path.abspath(self.credential_path)
+            tunnel = self._ssh_tunnels.get(tunnel_key)
+            if tunnel is None:
+                tunnel = self._create_ssh_tunnel(logger)
+                self._ssh_tunnel_holders.pop(tunnel_key, None)
+            if tunnel is not None:
+                self._ssh_tunnels[tunnel_key] = tunnel
+                self._ssh_tunnel_holders[tunnel_key] = self._ssh_tunnel_holders.get(tunnel_key, 0) + 1
+            self._tunnel = tunnel
+        return tunnel
+
+    def _create_ssh_tunnel(self, logger: Logger):
         try:
-            credentials = OmegaConf.load(self.credential_path)["CREDENTIALS"]["Connection"]
+            credentials = self._load_credentials_cached(self.credential_path)["CREDENTIALS"]["Connection"]
             if "Ssh" in credentials:
                 parameters = dict(credentials["Ssh"])
                 ssh_address_or_host = parameters["address"]
@@ -65,9 +119,22 @@ class DatabaseConnectorMYSQL(DatabaseConnector):
     def close_ssh_tunnel(self):
         if not self.database_configuration.use_ssh_tunnel:
             self.logger.warning("Attempt to close SSH tunnel, but ssh tunnel is not used.")
-        tunnel = self.get_ssh_tunnel(self.logger)
-        if tunnel is not None:
-            tunnel.stop(force=False)
+        # Only the tunnel held by this connector is released, no new tunnel is created just to be stopped
+        tunnel, self._tunnel = self._tunnel, None
+        if tunnel is None:
+            return
+        with self._ssh_tunnel_lock:
+            tunnel_key = os.path.abspath(self.credential_path)
+            if self._ssh_tunnels.get(tunnel_key) is tunnel:
+                self._ssh_tunnel_holders[tunnel_key] -= 1
+                if self._ssh_tunnel_holders[tunnel_key] > 0:
+                    # The tunnel is still used by other connectors of this process
+                    return
+                del self._ssh_tunnels[tunnel_key]
+                del self._ssh_tunnel_holders[tunnel_key]
+        # Pooled connections would keep the tunnel busy
+        self.dispose()
+        tunnel.stop(force=False)
 
     def _test_connection(self):
         try:
@@ -82,32 +149,135 @@ class DatabaseConnectorMYSQL(DatabaseConnector):
         try:
             connection = self.connect()
             cursor = self.cursor(connection)
-            self.execute(cursor, "SHOW DATABASES")
-            databases = [database[0] for database in self.fetchall(cursor)]
-
-            if self.database_configuration.database_name not in databases:
-                self.execute(cursor, f"CREATE DATABASE {self.database_configuration.database_name}")
-                self.commit(connection)
+            self.execute(cursor, f"CREATE DATABASE IF NOT EXISTS `{self.database_configuration.database_name}`")
+            self.commit(connection)
             self.close_connection(connection)
         except Exception as err:
             raise DatabaseCreationError(f"Error when creating database: \n {err}")
 
+    def _get_connection_pool_key(self) -> Tuple:
+        credentials = self._load_credentials_once()
+        # The process id is part of the key, as connections must not be shared with forked processes
+        return (os.getpid(), credentials["host"], credentials["user"], credentials["database"])
+
+    def _get_connection_pool(self, pool_key: Tuple = None) -> queue.LifoQueue:
+        if pool_key is None:
+            pool_key = self._get_connection_pool_key()
+        with self._connection_pool_lock:
+            pool = self._connection_pools.get(pool_key)
+            if pool is None:
+                pool = self._connection_pools[pool_key] = queue.LifoQueue(maxsize=self._connection_pool_size)
+        return pool
+
     def connect(self):
-        credentials = dict(self._get_database_credentials())
+        pool_key = self._get_connection_pool_key()
+        pool = self._get_connection_pool(pool_key)
+        connection = None
+        while connection is None:
+            try:
+                connection = pool.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                connection.ping(reconnect=False)
+            except Exception:
+                self._close_quietly(connection)
+                connection = None
+
+        if connection is None:
+            try:
+                connection = connect(**self._load_credentials_once())
+            except Error as err:
+                raise DatabaseConnectionError(err)
+        with self._connection_pool_lock:
+            self._connection_pool_keys[id(connection)] = pool_key
+        return connection
+
+    def cursor(self, connection, streaming: bool = False):
+        """
+        Creates a cursor for the given connection. If `streaming` is True, an unbuffered server-side cursor is created,
+        whose rows are fetched from the server while iterating over it instead of being buffered on the client.
+        """
+        if not streaming:
+            return super().cursor(connection)
         try:
-            return connect(**credentials)
-        except Error as err:
-            raise DatabaseConnectionError(err)
-        finally:
-            credentials = None
+            return connection.cursor(SSCursor)
+        except Exception as e:
+            raise DatabaseConnectionError(f"error \n{e}\n raised when creating cursor.")
 
     def close_connection(self, connection):
+        """
+        Returns the connection to the connection pool it was taken from, from which it is reused by the next call of
+        `connect`. Only if the pool is full or the connection is broken, the connection is actually closed.
+        """
+        with self._connection_pool_lock:
+            pool_key = self._connection_pool_keys.pop(id(connection), None)
+        if pool_key is not None and connection.open:
+            try:
+                # End any open transaction, so that the next user of the connection does not see a stale snapshot.
+                # The server status can not be used to skip this, as it is not updated by reads such as SELECT.
+                connection.rollback()
+                self._get_connection_pool(pool_key).put_nowait(connection)
+                return None
+            except (Error, queue.Full):
+                pass
         closed_connection = super().close_connection(connection)
         return closed_connection
 
+    @staticmethod
+    def _close_quietly(connection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def dispose(self) -> None:
+        """
+        Closes all pooled connections of this process to the database. Pooled connections that are left are closed
+        when the process exits.
+        """
+        self._drain_connection_pool(self._get_connection_pool())
+
+    @classmethod
+    def _drain_connection_pool(cls, pool: queue.LifoQueue) -> None:
+        while True:
+            try:
+                connection = pool.get_nowait()
+            except queue.Empty:
+                break
+            cls._close_quietly(connection)
+
+    @classmethod
+    def _dispose_all_connection_pools(cls) -> None:
+        with cls._connection_pool_lock:
+            # Pools inherited from a parent process are left alone, closing them would end the connections of the parent
+            pools = [pool for pool_key, pool in cls._connection_pools.items() if pool_key[0] == os.getpid()]
+        for pool in pools:
+            cls._drain_connection_pool(pool)
+
+    def _load_credentials_once(self) -> Mapping[str, str]:
+        """
+        Returns the database credentials, which are only read from the credential file again if the file has been
+        modified. Whether the file has been modified is checked at most every `_credentials_check_interval` seconds.
+        The credentials are returned as a read-only mapping, so they can be passed to `connect` without copying.
+        """
+        now = time.monotonic()
+        if self._credentials is not None and now - self._credentials_checked_at < self._credentials_check_interval:
+            return self._credentials
+
+        try:
+            mtime = os.path.getmtime(self.credential_path)
+        except OSError:
+            mtime = None
+        if self._credentials is None or mtime is None or mtime != self._credentials_mtime:
+            self._credentials = MappingProxyType(self._get_database_credentials())
+            self._credentials_mtime = mtime
+        self._credentials_checked_at = now
+        return self._credentials
+
     def _get_database_credentials(self):
         try:
-            credential_config = OmegaConf.load(self.credential_path)
+            credential_config = self._load_credentials_cached(self.credential_path)
             database_configuration = credential_config["CREDENTIALS"]["Database"]
             if self.database_configuration.use_ssh_tunnel:
                 server_address = credential_config["CREDENTIALS"]["Connection"]["Ssh"]["server"]
@@ -127,29 +297,27 @@ class DatabaseConnectorMYSQL(DatabaseConnector):
             logging.error(err)
             raise DatabaseCreationError("Invalid credentials file!")
 
+    @staticmethod
+    def _load_credentials_cached(path: str):
+        return utils.load_yaml_config(path)
+
     def _start_transaction(self, connection, readonly=False):
         if not readonly:
             connection.begin()
 
     def _table_exists(self, cursor, table_name: str = None) -> bool:
         table_name = table_name if table_name is not None else self.database_configuration.table_name
-        self.execute(cursor, f"SHOW TABLES LIKE '{table_name}'")
-        return self.fetchall(cursor)
+        self.execute(
+            cursor,
+            f"SELECT 1 FROM information_schema.tables WHERE table_schema = {self._prepared_statement_placeholder} AND table_name = {self._prepared_statement_placeholder} LIMIT 1",
+            (self.database_configuration.database_name, table_name),
+        )
+        return bool(self.fetchall(cursor))
 
     @staticmethod
     def get_autoincrement():
         return "AUTO_INCREMENT"
 
-    def _table_has_correct_structure(self, cursor, typed_fields: Dict[str, str]):
-        self.execute(
-            cursor,
-            f"SELECT COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_NAME = {self._prepared_statement_placeholder} AND TABLE_SCHEMA = {self._prepared_statement_placeholder}",
-            (self.database_configuration.table_name, self.database_configuration.database_name),
-        )
-        columns = self.fetchall(cursor)
-        columns = self._exclude_fixed_columns([column[0] for column in columns])
-        return set(columns) == set(typed_fields.keys())
-
     def _pull_open_experiment(self, random_order) -> Tuple[int, List, List]:
         try:
             connection = self.connect()
@@ -164,11 +332,57 @@ class DatabaseConnectorMYSQL(DatabaseConnector):
 
         return experiment_id, description, values
 
+    def _pull_open_experiments(self, random_order: bool, batch_size: int) -> Tuple[List[int], List, List]:
+        connection = self.connect()
+        try:
+            cursor = self.cursor(connection)
+            self._start_transaction(connection, readonly=False)
+            experiment_ids, description, values = self._select_open_experiment_batch_from_db(connection, cursor, random_order, batch_size)
+        except Exception as err:
+            connection.rollback()
+            raise err
+        finally:
+            self.close_connection(connection)
+
+        return experiment_ids, description, values
+
+    def update_experiments(self, table_name: str, experiment_ids: List[int], rows: List[Dict[str, Union[str, int, object]]]) -> None:
+        """
+        Updates multiple experiments at once, setting the values of `rows[i]` for the experiment `experiment_ids[i]`.
+        All `rows` have to contain the same keys. In contrast to `executemany`, which runs one `UPDATE` per row with
+        `pymysql`, each chunk of `_bulk_insert_batch_size` experiments is updated with a single statement.
+        """
+        columns = list(rows[0].keys())
+        connection = self.connect()
+        cursor = self.cursor(connection)
+        for start in range(0, len(rows), self._bulk_insert_batch_size):
+            chunk_ids = experiment_ids[start : start + self._bulk_insert_batch_size]
+            chunk_rows = rows[start : start + self._bulk_insert_batch_size]
+            query, values = self._prepare_batch_update_query(table_name, columns, chunk_ids, chunk_rows)
+            self.execute(cursor, query, values)
+        self.commit(connection)
+        self.close_connection(connection)
+
+    def _prepare_batch_update_query(
+        self, table_name: str, columns: List[str], experiment_ids: List[int], rows: List[Dict[str, Union[str, int, object]]]
+    ) -> Tuple[str, List]:
+        placeholder = self._prepared_statement_placeholder
+        cases = " ".join(f"WHEN {placeholder} THEN {placeholder}" for _ in experiment_ids)
+        assignments = ", ".join(f"{column} = CASE ID {cases} END" for column in columns)
+        query = f"UPDATE {table_name} SET {assignments} WHERE ID IN ({', '.join(placeholder for _ in experiment_ids)})"
+
+        values = list()
+        for column in columns:
+            for experiment_id, row in zip(experiment_ids, rows):
+                values.extend((experiment_id, row[column]))
+        values.extend(experiment_ids)
+        return query, values
+
     def _last_insert_id_string(self) -> str:
         return "LAST_INSERT_ID()"
 
-    def _get_pull_experiment_query(self, order_by: str):
-        return super()._get_pull_experiment_query(order_by) + " FOR UPDATE;"
+    def _get_pull_experiment_query(self, order_by: str, limit: int = 1):
+        return super()._get_pull_experiment_query(order_by, limit) + " FOR UPDATE;"
 
     @staticmethod
     def random_order_string():
@@ -176,16 +390,19 @@ class DatabaseConnectorMYSQL(DatabaseConnector):
 
     def _get_existing_rows(self, column_names):
         connection = self.connect()
-        cursor = self.cursor(connection)
+        cursor = self.cursor(connection, streaming=True)
         self.execute(cursor, f"SELECT {','.join(column_names)} FROM {self.database_configuration.table_name}")
-        values = self.fetchall(cursor)
+        existing_rows = frozenset(cursor)
         self.close_connection(connection)
-        return [dict(zip(column_names, existing_row)) for existing_row in values]
+        return existing_rows
 
-    def get_structure_from_table(self, cursor):
+    def _get_structure_from_table(self, cursor) -> List[str]:
         def _get_column_names_from_entries(entries):
             return [entry[0] for entry in entries]
 
         self.execute(cursor, f"SHOW COLUMNS FROM {self.database_configuration.table_name}")
         column_names = _get_column_names_from_entries(self.fetchall(cursor))
         return column_names
+
+
+atexit.register(DatabaseConnectorMYSQL._dispose_all_connection_pools)
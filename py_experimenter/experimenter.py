@@ -2,17 +2,18 @@ import logging
 import os
 import socket
 import traceback
-from typing import Callable, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
+import numpy as np
 import pandas as pd
 from codecarbon import EmissionsTracker, OfflineEmissionsTracker
-from joblib import Parallel, delayed
+from joblib import Parallel, delayed, effective_n_jobs
 
 from py_experimenter import utils
 from py_experimenter.config import PyExperimenterCfg
 from py_experimenter.database_connector_lite import DatabaseConnectorLITE
 from py_experimenter.database_connector_mysql import DatabaseConnectorMYSQL
-from py_experimenter.exceptions import InvalidConfigError, NoExperimentsLeftException
+from py_experimenter.exceptions import InvalidConfigError, InvalidResultFieldError, NoExperimentsLeftException
 from py_experimenter.experiment_status import ExperimentStatus
 from py_experimenter.result_processor import ResultProcessor
 
@@ -137,6 +138,14 @@ class PyExperimenter:
         else:
             self.logger.warning("No ssh tunnel to close")
 
+    def dispose(self) -> None:
+        """
+        Closes the database connections that are kept open for reuse by this process. Afterwards, the `PyExperimenter`
+        can still be used, in which case new connections are opened. Connections that are still kept open are closed
+        automatically when the process exits.
+        """
+        self.db_connector.dispose()
+
     def fill_table_from_combination(self, fixed_parameter_combinations: List[dict] = None, parameters: dict = None) -> None:
         """
         Adds rows to the database table based on the given information.
@@ -272,7 +281,9 @@ class PyExperimenter:
         If `n_jobs` is not given, a single process is created.
 
         Each process sequentially pulls and executes experiments from the database table, until all processes executed as
-        many experiments as defined by `max_experiments`. If `max_experiments == -1` all experiments will be executed.
+        many experiments as defined by `max_experiments`. The experiments are handed out to the processes one at a time,
+        so that processes finishing early take over further experiments. If `max_experiments == -1` all experiments will
+        be executed. Experiments beyond the number of open experiments are skipped.
 
         By default the order execution is determined by the id, but if `random_order` is set to `True`, the order is
         determined randomly.
@@ -311,15 +322,77 @@ class PyExperimenter:
 
         self._write_codecarbon_config()
 
+        n_jobs = effective_n_jobs(n_jobs)
         with Parallel(n_jobs=n_jobs) as parallel:
             if max_experiments == -1:
                 parallel(delayed(self._worker)(experiment_function, random_order) for _ in range(n_jobs))
             else:
-                parallel(delayed(self._execution_wrapper)(experiment_function, random_order) for _ in range(max_experiments))
+                parallel(delayed(self._execute_open_experiment)(experiment_function, random_order) for _ in range(max_experiments))
         self.logger.info("All configured executions finished.")
 
         self._delete_codecarbon_config()
 
+    def execute_batch(
+        self,
+        experiment_function: Callable[[Dict[str, np.ndarray], Dict], Dict[str, Iterable]],
+        batch_size: int = 1024,
+        random_order: bool = False,
+        max_experiments: int = -1,
+    ) -> None:
+        """
+        Pulls open experiments from the database table in batches and executes each batch with a single call of
+        `experiment_function`. This is useful for cheap experiments that can be vectorized, e.g., with NumPy, where the
+        overhead of executing each experiment separately dominates the runtime.
+
+        Up to `batch_size` open experiments are pulled at once and their status is set to `running`. Then
+        `experiment_function` is called with a dictionary mapping each keyfield to a `numpy.ndarray` holding its values
+        for all pulled experiments, and with the custom values of the experiment configuration file. It has to return a
+        dictionary mapping resultfields to sequences holding one result per pulled experiment, in the same order as the
+        keyfield values. The results are written to the database table at once and the status of the experiments is
+        set to `done`. If an error is raised, the error is logged into the database table for all experiments of the
+        batch and their status is set to `error`.
+
+        In contrast to `execute`, no `ResultProcessor` is given to `experiment_function`, therefore logtables can not be
+        filled and the experiments can not be paused. CodeCarbon is not supported for batched execution.
+
+        In the following, an example of an `experiment_function` is given:
+
+        >>> def run_batch(keyfields: Dict[str, np.ndarray], custom_fields: Dict) -> Dict[str, np.ndarray]:
+        >>>     return {
+        >>>         "sin": np.sin(keyfields["value"]) ** keyfields["exponent"],
+        >>>         "cos": np.cos(keyfields["value"]) ** keyfields["exponent"],
+        >>>     }
+
+        :param experiment_function: The function that should be executed with the keyfield values of a batch of experiments.
+        :type experiment_function: Callable[[Dict[str, np.ndarray], Dict], Dict[str, Iterable]]
+        :param batch_size: The maximum number of experiments pulled and executed at once. Defaults to `1024`.
+        :type batch_size: int, optional
+        :param random_order: If True, the order of the experiments is determined randomly. Defaults to False.
+        :type random_order: bool, optional
+        :param max_experiments: The number of experiments to be executed by this `PyExperimenter`. If all experiments
+            should be executed, set this to `-1`. Defaults to `-1`.
+        :type max_experiments: int, optional
+        :raises ValueError: If `batch_size` is smaller than `1`.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size has to be at least 1, but is {batch_size}.")
+        if self.use_codecarbon:
+            self.logger.warning("CodeCarbon is not supported for batched execution. Therefore no emissions are tracked.")
+
+        executed_experiments = 0
+        while max_experiments == -1 or executed_experiments < max_experiments:
+            if max_experiments == -1:
+                n_experiments = batch_size
+            else:
+                n_experiments = min(batch_size, max_experiments - executed_experiments)
+            try:
+                experiment_ids, keyfield_values = self.db_connector.get_experiment_configurations(random_order, n_experiments)
+            except NoExperimentsLeftException:
+                break
+            self._execute_experiment_batch(experiment_ids, keyfield_values, experiment_function)
+            executed_experiments += len(experiment_ids)
+        self.logger.info("All configured executions finished.")
+
     def unpause_experiment(self, experiment_id: int, experiment_function: Callable) -> None:
         """
         Pulls the experiment with the given `experiment_id` from the database (if it is `paused`) table and executes it. In
@@ -379,6 +452,20 @@ class PyExperimenter:
             except NoExperimentsLeftException:
                 break
 
+    def _execute_open_experiment(self, experiment_function: Callable[[Dict, Dict, ResultProcessor], None], random_order: bool) -> None:
+        """
+        Executes one open experiment if any is left. Otherwise nothing is done.
+
+        :param experiment_function: The function that should be executed with the different parametrizations.
+        :type experiment_function: Callable[[Dict, Dict, ResultProcessor], None]
+        :param random_order: If True, the order of the experiments is determined randomly. Defaults to False.
+        :type random_order: bool
+        """
+        try:
+            self._execution_wrapper(experiment_function, random_order)
+        except NoExperimentsLeftException:
+            pass
+
     def _execution_wrapper(
         self, experiment_function: Callable[[Dict, Dict, ResultProcessor], Optional[ExperimentStatus]], random_order: bool
     ) -> None:
@@ -452,6 +539,44 @@ class PyExperimenter:
                 emission_data = tracker._prepare_emissions_data().values
                 result_processor._write_emissions(emission_data, self.codecarbon_offline_mode)
 
+    def _execute_experiment_batch(
+        self,
+        experiment_ids: List[int],
+        keyfield_values: Dict[str, List[Any]],
+        experiment_function: Callable[[Dict[str, np.ndarray], Dict], Dict[str, Iterable]],
+    ) -> None:
+        keyfields = {keyfield_name: np.array(values) for keyfield_name, values in keyfield_values.items()}
+        metadata = {"name": self.name, "machine": socket.gethostname()}
+
+        try:
+            self.logger.debug(f"Start of batched experiment_function for {len(experiment_ids)} experiments on process {socket.gethostname()}")
+            results = experiment_function(keyfields, self.config.custom_configuration.custom_values)
+            # Convert NumPy scalars to Python values, which are supported by all database providers
+            results = {result_field: np.asarray(values).tolist() for result_field, values in results.items()}
+
+            invalid_result_keys = set(results.keys()) - set(self.config.database_configuration.resultfields)
+            if invalid_result_keys:
+                raise InvalidResultFieldError(f"Invalid result keys: {invalid_result_keys}.")
+            for result_field, values in results.items():
+                if len(values) != len(experiment_ids):
+                    raise ValueError(f"Expected {len(experiment_ids)} values for result field {result_field}, but got {len(values)}.")
+
+        except Exception:
+            error_msg = traceback.format_exc()
+            self.logger.error(error_msg)
+            end_date = utils.get_timestamp_representation()
+            rows = [{**metadata, "error": error_msg, "status": ExperimentStatus.ERROR.value, "end_date": end_date}] * len(experiment_ids)
+        else:
+            end_date = utils.get_timestamp_representation()
+            rows = []
+            for i in range(len(experiment_ids)):
+                experiment_results = {result_field: values[i] for result_field, values in results.items()}
+                if self.config.database_configuration.result_timestamps:
+                    experiment_results = ResultProcessor._add_timestamps_to_results(experiment_results)
+                rows.append({**metadata, **experiment_results, "status": ExperimentStatus.DONE.value, "end_date": end_date})
+
+        self.db_connector.update_experiments(self.config.database_configuration.table_name, experiment_ids, rows)
+
     def _write_codecarbon_config(self) -> None:
         """ "
         Writes the CodeCarbon config file if CodeCarbon is used in this experiment.
@@ -494,6 +619,16 @@ class PyExperimenter:
         """
         self.db_connector.delete_table()
 
+    def status_counts(self) -> Dict[str, int]:
+        """
+        Returns the number of experiments in the database table for each status, e.g., `{'created': 10, 'done': 20}`.
+        Statuses without experiments are not contained.
+
+        :return: The number of experiments for each status.
+        :rtype: Dict[str, int]
+        """
+        return self.db_connector.status_counts()
+
     def get_table(self) -> pd.DataFrame:
         """
         Returns the database table as `Pandas.DataFrame`.
@@ -1,11 +1,15 @@
 # todo ckeck which of thees utils are still neded
+import itertools
 import logging
+import os
+import threading
+from collections import OrderedDict
 from configparser import ConfigParser
+from copy import deepcopy
 from datetime import datetime
-from typing import Any, Dict, List, Union
+from typing import Any, Callable, Dict, List, Tuple, Union
 
-import numpy as np
-from omegaconf import DictConfig
+from omegaconf import DictConfig, OmegaConf
 
 from py_experimenter.exceptions import (
     ConfigError,
@@ -14,6 +18,37 @@ from py_experimenter.exceptions import (
 )
 
 
+_CONFIG_CACHE: "OrderedDict[Tuple[str, str], Tuple[float, int, Any]]" = OrderedDict()
+_CONFIG_CACHE_MAXSIZE = 100
+_CONFIG_CACHE_LOCK = threading.Lock()
+
+
+def _load_cached(path: str, loader: Callable[[str], Any], loader_name: str) -> Any:
+    """
+    Load the file at `path` with `loader`, reusing the parsed result as long as the modification time and size
+    of the file did not change. A deep copy is returned, so that callers can safely modify the result.
+    :param path: path to the file
+    :param loader: function parsing the file at the given path
+    :param loader_name: name identifying the loader, as the same file may be parsed by different loaders
+    :return: parsed content of the file
+    """
+    stat = os.stat(path)
+    key = (loader_name, os.path.abspath(path))
+    with _CONFIG_CACHE_LOCK:
+        cached = _CONFIG_CACHE.get(key)
+        if cached is not None and cached[:2] == (stat.st_mtime, stat.st_size):
+            _CONFIG_CACHE.move_to_end(key)
+            return deepcopy(cached[2])
+
+    content = loader(path)
+    with _CONFIG_CACHE_LOCK:
+        _CONFIG_CACHE[key] = (stat.st_mtime, stat.st_size, content)
+        _CONFIG_CACHE.move_to_end(key)
+        if len(_CONFIG_CACHE) > _CONFIG_CACHE_MAXSIZE:
+            _CONFIG_CACHE.popitem(last=False)
+    return deepcopy(content)
+
+
 def load_credential_config(path):
     """
     Load and return configuration file.
@@ -30,6 +65,16 @@ def load_credential_config(path):
     return dict(config["CREDENTIALS"])
 
 
+def load_yaml_config(path: str) -> DictConfig:
+    """
+    Load and return a YAML configuration file as `OmegaConf` object. Repeated loads of an unchanged file are
+    served from an in-memory cache.
+    :param path: path to the config file
+    :return: configuration file
+    """
+    return _load_cached(path, OmegaConf.load, "yaml_config")
+
+
 def write_codecarbon_config(codecarbon_config: DictConfig):
     configparser = ConfigParser()
     configparser.read_dict({"codecarbon": dict(codecarbon_config)})
@@ -92,53 +137,52 @@ def combine_fill_table_parameters(
     """
 
     def create_combination_from_parameters():
-        keyfield_data = list()
-        used_keys = list()
-
-        for keyfield_name in keyfield_names:
-            if keyfield_name in parameters.keys():
-                keyfield_data.append(parameters[keyfield_name])
-                used_keys.append(keyfield_name)
+        keyfield_data = [parameters[keyfield_name] for keyfield_name in used_keys]
 
         if keyfield_data:
-            combinations = np.array(np.meshgrid(*keyfield_data), dtype=object).T.reshape(-1, len(keyfield_data))
-            combinations = [dict(zip(used_keys, combination)) for combination in combinations]
+            combinations = [dict(zip(used_keys, combination)) for combination in itertools.product(*keyfield_data)]
         else:
             combinations = []
         return combinations
 
+    def check_fixed_parameter_combinations(combined_keys):
+        # every combination within one fixed parameter combination has the same keys, so each one is checked only once
+        for fixed_parameter_combination in fixed_parameter_combinations:
+            if not combined_keys.isdisjoint(fixed_parameter_combination.keys()):
+                raise ParameterCombinationError("There is at least one key that is used more than once!")
+
+        for fixed_parameter_combination in fixed_parameter_combinations:
+            if combined_keys.union(fixed_parameter_combination.keys()) != expected_keys:
+                raise ParameterCombinationError(
+                    "The number of config_parameters + individual_parameters + parameters does not match the amount of keyfields!"
+                )
+
     def add_individual_parameters_to_combinations():
         new_combinations = list()
         if combinations:
             for combination in combinations:
                 for fixed_parameter_combination in fixed_parameter_combinations:
-                    try:
-                        new_combination = dict(**combination, **fixed_parameter_combination)
-                    except TypeError:
-                        raise ParameterCombinationError("There is at least one key that is used more than once!")
-                    new_combinations.append(new_combination)
+                    new_combinations.append({**combination, **fixed_parameter_combination})
         else:
             new_combinations = fixed_parameter_combinations
 
         return new_combinations
 
+    expected_keys = set(keyfield_names)
+    used_keys = [keyfield_name for keyfield_name in keyfield_names if keyfield_name in parameters.keys()]
     combinations = create_combination_from_parameters()
 
     if fixed_parameter_combinations:
+        check_fixed_parameter_combinations(set(used_keys) if combinations else set())
         combinations = add_individual_parameters_to_combinations()
+    elif combinations and set(used_keys) != expected_keys:
+        raise ParameterCombinationError(
+            "The number of config_parameters + individual_parameters + parameters does not match the amount of keyfields!"
+        )
 
     if not combinations:
         raise ParameterCombinationError("No parameter combination found!")
 
-    for combination in combinations:
-        if len(combination.keys()) != len(set(combination.keys())):
-            raise ParameterCombinationError(f"There is at least one key that is used more than once in {str(combination.keys())}!")
-
-        if set(combination.keys()) != set(keyfield_names):
-            raise ParameterCombinationError(
-                "The number of config_parameters + individual_parameters + parameters does not match the amount of keyfields!"
-            )
-
     return combinations
 
 
@@ -36,18 +36,20 @@ def test_constructor(test_connetion_mock):
 
 
 @pytest.mark.parametrize(
-    "combination, existing_rows, result",
+    "combination, existing_rows, column_names, result",
     [
-        ({"value": 1, "exponent": 2}, [{"value": 1, "exponent": 2}], True),
-        ({"value": 1, "exponent": 2}, [], False),
-        ({"value": 3, "exponent": 4}, [{"value": 1, "exponent": 2}, {"value": 3, "exponent": 4}], True),
-        ({"value": 1, "exponent": 4}, [{"value": 1, "exponent": 2}, {"value": 3, "exponent": 4}], False),
-        ({"value": 1}, [{"value": 1}], True),
-        ({"value": 1}, [{"value": 2}], False),
+        ({"value": 1, "exponent": 2}, frozenset([(1, 2)]), ["value", "exponent"], True),
+        ({"value": 1, "exponent": 2}, frozenset(), ["value", "exponent"], False),
+        ({"value": 3, "exponent": 4}, frozenset([(1, 2), (3, 4)]), ["value", "exponent"], True),
+        ({"value": 1, "exponent": 4}, frozenset([(1, 2), (3, 4)]), ["value", "exponent"], False),
+        ({"exponent": 4, "value": 3}, frozenset([(1, 2), (3, 4)]), ["value", "exponent"], True),
+        ({"value": 1}, frozenset([(1,)]), ["value"], True),
+        ({"value": 1}, frozenset([(2,)]), ["value"], False),
+        ({"value": 1}, frozenset([(1, 2)]), ["value", "exponent"], False),
     ],
 )
-def test_check_combination_in_existing_rows(combination, existing_rows, result):
-    assert result == DatabaseConnector._check_combination_in_existing_rows(None, combination, existing_rows)
+def test_check_combination_in_existing_rows(combination, existing_rows, column_names, result):
+    assert result == DatabaseConnector._check_combination_in_existing_rows(None, combination, existing_rows, column_names)
 
 
 @pytest.fixture
@@ -76,7 +78,7 @@ def test_create_table_if_not_existing(
     connector.create_table_if_not_existing()
 
     expected_crate_table_statement = (
-        "CREATE TABLE test_table (ID INTEGER PRIMARY KEY AUTOINCREMENT, value int DEFAULT NULL,exponent int DEFAULT NULL,"
+        "CREATE TABLE IF NOT EXISTS test_table (ID INTEGER PRIMARY KEY AUTOINCREMENT, value int DEFAULT NULL,exponent int DEFAULT NULL,"
         "creation_date DATETIME DEFAULT NULL,status VARCHAR(255) DEFAULT NULL,start_date DATETIME DEFAULT NULL,"
         "name LONGTEXT DEFAULT NULL,machine VARCHAR(255) DEFAULT NULL,sin FLOAT DEFAULT NULL,cos FLOAT DEFAULT NULL,"
         "end_date DATETIME DEFAULT NULL,error LONGTEXT DEFAULT NULL);"
@@ -118,7 +120,7 @@ def test_fill_table(
 ):
     create_database_if_not_existing_mock.return_value = None
     test_connection_mock.return_value = None
-    get_existing_rows_mock.return_value = []
+    get_existing_rows_mock.return_value = frozenset()
     write_to_database_mock.return_value = None
     logger = logging.getLogger("test_logger")
 
@@ -251,3 +253,45 @@ def test_delete_table(
 
     assert execute_mock.call_count == 1
     assert execute_mock.call_args[0][1] == "DROP TABLE IF EXISTS test_table"
+
+
+@patch.object(database_connector.DatabaseConnector, "executemany")
+def test_bulk_insert(executemany_mock, connector: DatabaseConnector):
+    rows = [[value, value + 1] for value in range(5)]
+    connector._bulk_insert(None, "test_table", ["value", "exponent"], rows, batch_size=2)
+
+    assert executemany_mock.call_count == 3
+    for call, expected_rows in zip(executemany_mock.call_args_list, [rows[:2], rows[2:4], rows[4:]]):
+        assert call[0][1] == "INSERT INTO test_table (value, exponent) VALUES (?, ?)"
+        assert call[0][2] == expected_rows
+
+
+@patch.object(database_connector_lite.DatabaseConnectorLITE, "_get_structure_from_table")
+@patch.object(database_connector_lite.DatabaseConnectorLITE, "connect")
+@patch.object(database_connector_lite.DatabaseConnectorLITE, "cursor")
+@patch.object(database_connector_lite.DatabaseConnectorLITE, "execute")
+@patch.object(database_connector_lite.DatabaseConnectorLITE, "commit")
+@patch.object(database_connector_lite.DatabaseConnectorLITE, "close_connection")
+def test_get_structure_from_table_is_cached(
+    close_connection_mock, commit_mock, execute_mock, cursor_mock, connect_mock, get_structure_from_table_mock, connector: DatabaseConnector
+):
+    get_structure_from_table_mock.return_value = ["ID", "value", "exponent"]
+
+    assert connector.get_structure_from_table(None) == ["ID", "value", "exponent"]
+    assert connector.get_structure_from_table(None) == ["ID", "value", "exponent"]
+    assert get_structure_from_table_mock.call_count == 1
+
+    connector.delete_table()
+    connector.get_structure_from_table(None)
+    assert get_structure_from_table_mock.call_count == 2
+
+
+def test_queries_are_cached(connector: DatabaseConnector):
+    insert_query = connector._get_insert_query("test_table", ["value", "exponent"])
+    assert insert_query == "INSERT INTO test_table (value, exponent) VALUES (?, ?)"
+    assert connector._get_insert_query("test_table", ["value", "exponent"]) is insert_query
+    assert connector.prepare_write_query("test_table", {"value": 1, "exponent": 2}.keys()) is insert_query
+
+    assert connector._get_select_keyfields_query() == "SELECT value,exponent FROM test_table WHERE id = ?;"
+    assert connector._get_start_experiment_query() == "UPDATE test_table SET status = ?, start_date = ? WHERE id = ?;"
+    assert connector._get_start_experiment_query() is connector._get_start_experiment_query()
@@ -1,7 +1,19 @@
+import logging
+import os
+import pickle
+import tempfile
+from types import MappingProxyType, SimpleNamespace
 from typing import Dict
 
 import pytest
+from mock import MagicMock, patch
+from omegaconf import OmegaConf
+from pymysql.constants import SERVER_STATUS
+from pymysql.cursors import SSCursor
+
+from py_experimenter import database_connector_mysql
 from py_experimenter.database_connector_mysql import DatabaseConnectorMYSQL
+from py_experimenter.exceptions import DatabaseConnectionError
 
 
 @pytest.mark.parametrize(
@@ -22,3 +34,245 @@ def test_prepare_update_query(values: Dict, expected: str, condition: str):
 
     self = A()
     assert DatabaseConnectorMYSQL._prepare_update_query(self, "some_table", values, condition) == expected
+
+
+def test_prepare_batch_update_query():
+    self = DatabaseConnectorMYSQL.__new__(DatabaseConnectorMYSQL)
+    query, values = self._prepare_batch_update_query(
+        "some_table", ["status", "sin"], [3, 7], [{"status": "done", "sin": 0.5}, {"status": "error", "sin": None}]
+    )
+
+    assert query == (
+        "UPDATE some_table SET status = CASE ID WHEN %s THEN %s WHEN %s THEN %s END, sin = CASE ID WHEN %s THEN %s WHEN %s THEN %s END"
+        " WHERE ID IN (%s, %s)"
+    )
+    assert values == [3, "done", 7, "error", 3, 0.5, 7, None, 3, 7]
+
+
+@pytest.fixture
+def make_connector():
+    def _make_connector(credential_path=os.path.join("test", "test_config_files", "load_config_test_file", "mysql_fake_credentials.cfg")):
+        connector = DatabaseConnectorMYSQL.__new__(DatabaseConnectorMYSQL)
+        connector.credential_path = credential_path
+        connector.logger = logging.getLogger("test_logger")
+        connector.database_configuration = SimpleNamespace(use_ssh_tunnel=True, table_name="some_table")
+        connector._tunnel = None
+        connector._credentials = None
+        connector._credentials_mtime = None
+        connector._credentials_checked_at = None
+        return connector
+
+    yield _make_connector
+
+    # connection pools and ssh tunnels are shared by all connectors of a process
+    DatabaseConnectorMYSQL._connection_pools.clear()
+    DatabaseConnectorMYSQL._connection_pool_keys.clear()
+    DatabaseConnectorMYSQL._ssh_tunnels.clear()
+    DatabaseConnectorMYSQL._ssh_tunnel_holders.clear()
+
+
+@pytest.fixture
+def connector(make_connector):
+    return make_connector()
+
+
+@pytest.fixture
+def ssh_credential_path():
+    with tempfile.TemporaryDirectory() as directory:
+        credential_path = os.path.join(directory, "credentials.yml")
+        with open(credential_path, "w") as f:
+            f.write("CREDENTIALS:\n  Connection:\n    Ssh:\n      address: ssh.example.com\n")
+        yield credential_path
+
+
+@patch.object(database_connector_mysql.sshtunnel, "SSHTunnelForwarder")
+def test_get_ssh_tunnel_is_memoized(ssh_tunnel_forwarder_mock, make_connector, ssh_credential_path):
+    logger = logging.getLogger("test_logger")
+    connectors = [make_connector(ssh_credential_path) for _ in range(2)]
+
+    tunnel = connectors[0].get_ssh_tunnel(logger)
+    assert connectors[0].get_ssh_tunnel(logger) is tunnel
+    assert connectors[1].get_ssh_tunnel(logger) is tunnel
+    assert ssh_tunnel_forwarder_mock.call_count == 1
+    assert connectors[0].__getstate__()["_tunnel"] is None
+
+
+def test_load_credentials_cached_matches_omegaconf():
+    with tempfile.TemporaryDirectory() as directory:
+        credential_path = os.path.join(directory, "credentials.yml")
+        with open(credential_path, "w") as f:
+            f.write("CREDENTIALS:\n  Database:\n    user: 1e5\n    password: 2020-01-01\n")
+
+        credentials = DatabaseConnectorMYSQL._load_credentials_cached(credential_path)
+        assert credentials == OmegaConf.load(credential_path)
+        assert credentials["CREDENTIALS"]["Database"]["user"] == 100000.0
+        assert credentials["CREDENTIALS"]["Database"]["password"] == "2020-01-01"
+
+
+@patch.object(database_connector_mysql, "connect")
+@patch.object(DatabaseConnectorMYSQL, "_get_database_credentials")
+def test_connect_loads_credentials_once(get_database_credentials_mock, connect_mock, connector):
+    get_database_credentials_mock.return_value = {"host": "host", "user": "user", "password": "password", "database": "database"}
+
+    connector.connect()
+    connector.connect()
+
+    assert get_database_credentials_mock.call_count == 1
+    assert connect_mock.call_count == 2
+    connect_mock.assert_called_with(host="host", user="user", password="password", database="database")
+    assert connector._credentials["password"] == "password"
+    with pytest.raises(TypeError):
+        connector._credentials["password"] = "other_password"
+
+
+def test_pickle_drops_credentials(connector):
+    connector._credentials = MappingProxyType({"host": "host", "user": "user", "password": "password", "database": "database"})
+    connector._credentials_mtime = 1.0
+    connector._credentials_checked_at = 1.0
+
+    data = pickle.dumps(connector)
+    assert b"password" not in data
+
+    unpickled_connector = pickle.loads(data)
+    assert unpickled_connector.credential_path == connector.credential_path
+    assert unpickled_connector._credentials is None
+    assert unpickled_connector._credentials_mtime is None
+    assert unpickled_connector._credentials_checked_at is None
+
+
+@patch.object(DatabaseConnectorMYSQL, "dispose")
+@patch.object(database_connector_mysql.sshtunnel, "SSHTunnelForwarder")
+def test_close_ssh_tunnel_does_not_create_tunnel(ssh_tunnel_forwarder_mock, dispose_mock, connector):
+    connector.close_ssh_tunnel()
+    assert ssh_tunnel_forwarder_mock.call_count == 0
+
+    tunnel = ssh_tunnel_forwarder_mock.return_value
+    connector._tunnel = tunnel
+    connector.close_ssh_tunnel()
+    tunnel.stop.assert_called_once_with(force=False)
+    dispose_mock.assert_called_once()
+    assert connector._tunnel is None
+
+
+@patch.object(DatabaseConnectorMYSQL, "dispose")
+@patch.object(database_connector_mysql.sshtunnel, "SSHTunnelForwarder")
+def test_shared_ssh_tunnel_is_stopped_by_last_holder(ssh_tunnel_forwarder_mock, dispose_mock, make_connector, ssh_credential_path):
+    logger = logging.getLogger("test_logger")
+    connectors = [make_connector(ssh_credential_path) for _ in range(2)]
+    for connector in connectors:
+        connector.get_ssh_tunnel(logger)
+    tunnel = ssh_tunnel_forwarder_mock.return_value
+
+    connectors[0].close_ssh_tunnel()
+    tunnel.stop.assert_not_called()
+    dispose_mock.assert_not_called()
+    assert connectors[1]._tunnel is tunnel
+    assert connectors[1].get_ssh_tunnel(logger) is tunnel
+
+    connectors[1].close_ssh_tunnel()
+    tunnel.stop.assert_called_once_with(force=False)
+    dispose_mock.assert_called_once()
+    assert os.path.abspath(ssh_credential_path) not in DatabaseConnectorMYSQL._ssh_tunnels
+    assert os.path.abspath(ssh_credential_path) not in DatabaseConnectorMYSQL._ssh_tunnel_holders
+
+
+@patch.object(database_connector_mysql, "connect")
+@patch.object(DatabaseConnectorMYSQL, "_get_database_credentials")
+def test_connections_are_pooled(get_database_credentials_mock, connect_mock, connector):
+    get_database_credentials_mock.return_value = {"host": "host", "user": "user", "password": "password", "database": "database"}
+    connect_mock.side_effect = lambda **kwargs: MagicMock(open=True, server_status=SERVER_STATUS.SERVER_STATUS_IN_TRANS)
+
+    connection = connector.connect()
+    connector.close_connection(connection)
+    connection.rollback.assert_called_once()
+    connection.close.assert_not_called()
+
+    assert connector.connect() is connection
+    assert connect_mock.call_count == 1
+    connection.ping.assert_called_once_with(reconnect=False)
+
+    # The read snapshot of a SELECT has to be ended even if the server status does not report a transaction
+    connection.server_status = SERVER_STATUS.SERVER_STATUS_AUTOCOMMIT
+    connector.close_connection(connection)
+    assert connection.rollback.call_count == 2
+    connector.dispose()
+    connection.close.assert_called_once()
+    assert connector.connect() is not connection
+    assert connect_mock.call_count == 2
+
+
+@patch.object(database_connector_mysql, "connect")
+@patch.object(DatabaseConnectorMYSQL, "_get_database_credentials")
+def test_connection_is_returned_to_its_own_pool(get_database_credentials_mock, connect_mock, connector):
+    get_database_credentials_mock.return_value = {"host": "old_host", "user": "user", "password": "password", "database": "database"}
+    connect_mock.side_effect = lambda **kwargs: MagicMock(open=True, server_status=0)
+
+    connection = connector.connect()
+    old_pool_key = connector._get_connection_pool_key()
+
+    # The credential file is reloaded before the connection is returned
+    get_database_credentials_mock.return_value = {"host": "new_host", "user": "user", "password": "password", "database": "database"}
+    connector._credentials = None
+    connector.close_connection(connection)
+
+    assert connector._get_connection_pool().empty()
+    assert connector._get_connection_pool(old_pool_key).get_nowait() is connection
+
+
+@patch.object(database_connector_mysql, "connect")
+@patch.object(DatabaseConnectorMYSQL, "_get_database_credentials")
+def test_get_existing_rows_streams_rows(get_database_credentials_mock, connect_mock, connector):
+    get_database_credentials_mock.return_value = {"host": "host", "user": "user", "password": "password", "database": "database"}
+    connection = MagicMock(open=True, server_status=0)
+    connect_mock.return_value = connection
+    cursor = connection.cursor.return_value
+    cursor.__iter__.return_value = iter([(1, "a"), (2, "b"), (1, "a")])
+
+    existing_rows = connector._get_existing_rows(["value", "name"])
+
+    connection.cursor.assert_called_once_with(SSCursor)
+    cursor.execute.assert_called_once_with("SELECT value,name FROM some_table")
+    cursor.fetchall.assert_not_called()
+    assert existing_rows == frozenset({(1, "a"), (2, "b")})
+
+
+@patch.object(database_connector_mysql, "connect")
+@patch.object(DatabaseConnectorMYSQL, "_get_database_credentials")
+def test_status_counts_on_reused_connection(get_database_credentials_mock, connect_mock, connector):
+    get_database_credentials_mock.return_value = {"host": "host", "user": "user", "password": "password", "database": "database"}
+    connection = MagicMock(open=True, server_status=0)
+    connect_mock.return_value = connection
+    # the second count is read after another connection marked all experiments as done
+    connection.cursor.return_value.fetchall.side_effect = [[("created", 30)], [("done", 30)]]
+
+    assert connector.status_counts() == {"created": 30}
+    connection.commit.assert_called_once()
+
+    assert connector.status_counts() == {"done": 30}
+    assert connect_mock.call_count == 1
+    assert connection.commit.call_count == 2
+
+
+@patch.object(database_connector_mysql, "connect")
+@patch.object(DatabaseConnectorMYSQL, "_get_database_credentials")
+def test_update_experiments_uses_one_statement_per_chunk(get_database_credentials_mock, connect_mock, connector):
+    get_database_credentials_mock.return_value = {"host": "host", "user": "user", "password": "password", "database": "database"}
+    connection = MagicMock(open=True, server_status=0)
+    connect_mock.return_value = connection
+    cursor = connection.cursor.return_value
+    connector._bulk_insert_batch_size = 2
+
+    connector.update_experiments("some_table", [1, 2, 3], [{"status": "done"}] * 3)
+
+    assert cursor.execute.call_count == 2
+    cursor.executemany.assert_not_called()
+    assert cursor.execute.call_args_list[1].args[1] == [3, "done", 3]
+    connection.commit.assert_called_once()
+
+
+@patch.object(DatabaseConnectorMYSQL, "connect")
+def test_pull_open_experiments_raises_connection_error(connect_mock, connector):
+    connect_mock.side_effect = DatabaseConnectionError("connection refused")
+
+    with pytest.raises(DatabaseConnectionError, match="connection refused"):
+        connector._pull_open_experiments(random_order=False, batch_size=8)
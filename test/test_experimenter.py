@@ -1,11 +1,16 @@
+import logging
 import os
+import threading
+from types import SimpleNamespace
 
 import pytest
+from joblib import parallel_backend
 from mock import patch
 
 from py_experimenter import database_connector, database_connector_mysql
 from py_experimenter.database_connector_lite import DatabaseConnectorLITE
 from py_experimenter.database_connector_mysql import DatabaseConnectorMYSQL
+from py_experimenter.exceptions import NoExperimentsLeftException
 from py_experimenter.experimenter import PyExperimenter
 
 CREDENTIAL_PATH = os.path.join("test", "test_config_files", "load_config_test_file", "mysql_fake_credentials.cfg")
@@ -105,3 +110,32 @@ def test_init(
     assert experimenter.config.database_configuration.table_name == expected_table_name
     assert experimenter.config.database_configuration.database_name == expected_database_name
     assert experimenter.db_connector.__class__ == expected_db_connector_class
+
+
+@pytest.mark.parametrize(
+    "max_experiments, open_experiments, expected_executions",
+    [
+        (5, 30, 5),
+        (7, 4, 4),
+    ],
+)
+def test_execute_hands_out_experiments_dynamically(max_experiments, open_experiments, expected_executions):
+    experimenter = PyExperimenter.__new__(PyExperimenter)
+    experimenter.config = SimpleNamespace(n_jobs=2)
+    experimenter.use_codecarbon = False
+    experimenter.logger = logging.getLogger("test_logger")
+
+    lock = threading.Lock()
+    executions = list()
+
+    def execution_wrapper(experiment_function, random_order):
+        with lock:
+            if len(executions) == open_experiments:
+                raise NoExperimentsLeftException("No experiments left")
+            executions.append(threading.get_ident())
+
+    # the threading backend keeps the patched method in effect for all workers
+    with patch.object(PyExperimenter, "_execution_wrapper", side_effect=execution_wrapper), parallel_backend("threading"):
+        experimenter.execute(lambda: None, max_experiments=max_experiments, n_jobs=2)
+
+    assert len(executions) == expected_executions
@@ -45,13 +45,13 @@ def test_tables_created(
     experimenter = PyExperimenter(os.path.join("test", "test_logtables", "mysql_logtables.yml"))
     experimenter.fill_table_from_config()
     assert execute_mock.mock_calls[1][1][1] == (
-        "CREATE TABLE test_mysql_logtables (ID INTEGER PRIMARY KEY AUTO_INCREMENT, value int DEFAULT NULL,"
+        "CREATE TABLE IF NOT EXISTS test_mysql_logtables (ID INTEGER PRIMARY KEY AUTO_INCREMENT, value int DEFAULT NULL,"
         "exponent int DEFAULT NULL,creation_date DATETIME DEFAULT NULL,status VARCHAR(255) DEFAULT NULL,"
         "start_date DATETIME DEFAULT NULL,name LONGTEXT DEFAULT NULL,machine VARCHAR(255) DEFAULT NULL,"
         "sin float DEFAULT NULL,cos float DEFAULT NULL,end_date DATETIME DEFAULT NULL,error LONGTEXT DEFAULT NULL);"
     )
     assert execute_mock.mock_calls[2][1][1] == (
-        "CREATE TABLE test_mysql_logtables__log (ID INTEGER PRIMARY KEY AUTO_INCREMENT,"
+        "CREATE TABLE IF NOT EXISTS test_mysql_logtables__log (ID INTEGER PRIMARY KEY AUTO_INCREMENT,"
         " experiment_id INTEGER, timestamp DATETIME, test int DEFAULT NULL, FOREIGN KEY (experiment_id)"
         " REFERENCES test_mysql_logtables(ID) ON DELETE CASCADE);"
     )
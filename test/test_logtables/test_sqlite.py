@@ -35,18 +35,18 @@ def test_tables_created(
     experimenter.fill_table_from_config()
     assert execute_mock.call_count == 4
     assert execute_mock.mock_calls[0][1][1] == (
-        "CREATE TABLE test_sqlite_logtables (ID INTEGER PRIMARY KEY AUTOINCREMENT, value int DEFAULT NULL,"
+        "CREATE TABLE IF NOT EXISTS test_sqlite_logtables (ID INTEGER PRIMARY KEY AUTOINCREMENT, value int DEFAULT NULL,"
         "exponent int DEFAULT NULL,creation_date DATETIME DEFAULT NULL,status VARCHAR(255) DEFAULT NULL,"
         "start_date DATETIME DEFAULT NULL,name LONGTEXT DEFAULT NULL,machine VARCHAR(255) DEFAULT NULL,"
         "sin float DEFAULT NULL,cos float DEFAULT NULL,end_date DATETIME DEFAULT NULL,"
         "error LONGTEXT DEFAULT NULL);"
     )
     assert execute_mock.mock_calls[1][1][1] == (
-        "CREATE TABLE test_sqlite_logtables__log (ID INTEGER PRIMARY KEY AUTOINCREMENT, experiment_id INTEGER,"
+        "CREATE TABLE IF NOT EXISTS test_sqlite_logtables__log (ID INTEGER PRIMARY KEY AUTOINCREMENT, experiment_id INTEGER,"
         " timestamp DATETIME, test int DEFAULT NULL, FOREIGN KEY (experiment_id) REFERENCES test_sqlite_logtables(ID) ON DELETE CASCADE);"
     )
     assert execute_mock.mock_calls[2][1][1] == (
-        "CREATE TABLE test_sqlite_logtables__log2 (ID INTEGER PRIMARY KEY AUTOINCREMENT, experiment_id INTEGER,"
+        "CREATE TABLE IF NOT EXISTS test_sqlite_logtables__log2 (ID INTEGER PRIMARY KEY AUTOINCREMENT, experiment_id INTEGER,"
         " timestamp DATETIME, test_2 int DEFAULT NULL, FOREIGN KEY (experiment_id) REFERENCES test_sqlite_logtables(ID) ON DELETE CASCADE);"
     )
 
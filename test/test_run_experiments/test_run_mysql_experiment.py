@@ -2,6 +2,7 @@ import logging
 import os
 from math import cos, sin
 
+import numpy as np
 import pandas as pd
 from pymysql.err import ProgrammingError
 
@@ -23,14 +24,7 @@ def own_function(keyfields: dict, result_processor: ResultProcessor, custom_fiel
 
 
 def check_done_entries(experimenter: PyExperimenter, amount_of_entries: int):
-    connection = experimenter.db_connector.connect()
-    cursor = experimenter.db_connector.cursor(connection)
-    cursor.execute(f"SELECT * FROM {experimenter.db_connector.database_configuration.table_name} WHERE status = 'done'")
-    entries = cursor.fetchall()
-
-    assert amount_of_entries == len(entries)
-
-    experimenter.db_connector.close_connection(connection)
+    assert amount_of_entries == experimenter.status_counts().get("done", 0)
 
 
 def test_run_all_mqsql_experiments():
@@ -64,21 +58,22 @@ def test_run_all_mqsql_experiments():
     connection = experimenter.db_connector.connect()
     cursor = experimenter.db_connector.cursor(connection)
     cursor.execute(f"DELETE FROM {experimenter.db_connector.database_configuration.table_name} WHERE ID = 1")
+    assert cursor.rowcount == 1
     experimenter.db_connector.commit(connection)
     experimenter.db_connector.close_connection(connection)
-    check_done_entries(experimenter, 29)
 
     experimenter.fill_table_from_config()
     experimenter.execute(own_function, -1)
-    check_done_entries(experimenter, 30)
+    # read IDs and statuses in one round-trip instead of a separate status count
     connection = experimenter.db_connector.connect()
     cursor = experimenter.db_connector.cursor(connection)
-    cursor.execute(f"SELECT ID FROM {experimenter.db_connector.database_configuration.table_name}")
+    cursor.execute(f"SELECT ID, status FROM {experimenter.db_connector.database_configuration.table_name}")
     entries = cursor.fetchall()
     experimenter.db_connector.close_connection(connection)
 
     assert len(entries) == 30
     assert set(range(2, 32)) == set(entry[0] for entry in entries)
+    assert all(entry[1] == "done" for entry in entries)
 
 
 def test_mysql_shh():
@@ -117,13 +112,37 @@ def test_no_experiment_double_execution():
     # At most 30 experiments should be executed. If the experiment is executed twice, there should be less then 30 entries
     experimenter.execute(own_function, max_experiments=30, n_jobs=5)
 
-    connection = experimenter.db_connector.connect()
-    cursor = experimenter.db_connector.cursor(connection)
-    cursor.execute(f"SELECT * FROM {experimenter.db_connector.database_configuration.table_name} WHERE status = 'done'")
-    entries = cursor.fetchall()
-
     # If the experiment is executed twice, there should be less then 30 entries
-    assert len(entries) == 30
+    check_done_entries(experimenter, 30)
+
+
+def own_batch_function(keyfields: dict, custom_fields: dict):
+    # run the experiments of the whole batch at once for the sin and cos function
+    return {
+        "sin": np.sin(keyfields["value"]) ** keyfields["exponent"],
+        "cos": np.cos(keyfields["value"]) ** keyfields["exponent"],
+    }
+
+
+def test_execute_batch():
+    experiment_configuration_file_path = os.path.join("test", "test_run_experiments", "test_run_mysql_experiment_config.yml")
+    experimenter = PyExperimenter(experiment_configuration_file_path=experiment_configuration_file_path, use_codecarbon=False, use_ssh_tunnel=False)
+    try:
+        experimenter.delete_table()
+    except ProgrammingError as e:
+        logging.warning(e)
+    experimenter.fill_table_from_config()
+
+    experimenter.execute_batch(own_batch_function, batch_size=8, max_experiments=20)
+    check_done_entries(experimenter, 20)
+
+    experimenter.execute_batch(own_batch_function, batch_size=8)
+    check_done_entries(experimenter, 30)
+
+    table = experimenter.get_table()
+    for _, row in table.iterrows():
+        assert row["sin"] == pytest.approx(sin(row["value"]) ** row["exponent"], abs=1e-5)
+        assert row["cos"] == pytest.approx(cos(row["value"]) ** row["exponent"], abs=1e-5)
 
 
 def error_function(keyfields: dict, result_processor: ResultProcessor, custom_fields: dict):
@@ -4,6 +4,7 @@ import socket
 from math import cos, sin
 from tempfile import TemporaryFile
 
+import numpy as np
 import pandas as pd
 import pytest
 from pymysql.err import ProgrammingError
@@ -24,15 +25,8 @@ def own_function(keyfields: dict, result_processor: ResultProcessor, custom_fiel
     result_processor.process_results(result)
 
 
-def check_done_entries(experimenter, amount_of_entries, table_name="test_table"):
-    connection = experimenter.db_connector.connect()
-    cursor = experimenter.db_connector.cursor(connection)
-    cursor.execute(f"SELECT * FROM {table_name} WHERE status = 'done'")
-    entries = cursor.fetchall()
-
-    assert amount_of_entries == len(entries)
-
-    experimenter.db_connector.close_connection(connection)
+def check_done_entries(experimenter, amount_of_entries):
+    assert amount_of_entries == experimenter.status_counts().get("done", 0)
 
 
 def test_run_all_sqlite_experiments():
@@ -59,17 +53,17 @@ def test_run_all_sqlite_experiments():
     experimenter = PyExperimenter(config_path, use_codecarbon=False)
     experimenter.fill_table_from_config()
     experimenter.execute(own_function, -1)
-    check_done_entries(experimenter, 30, "test_table_config")
+    check_done_entries(experimenter, 30)
     connection = experimenter.db_connector.connect()
     cursor = experimenter.db_connector.cursor(connection)
     cursor.execute("DELETE FROM test_table_config WHERE ID = 1")
     experimenter.db_connector.commit(connection)
     experimenter.db_connector.close_connection(connection)
-    check_done_entries(experimenter, 29, "test_table_config")
+    check_done_entries(experimenter, 29)
 
     experimenter.fill_table_from_config()
     experimenter.execute(own_function, -1)
-    check_done_entries(experimenter, 30, "test_table_config")
+    check_done_entries(experimenter, 30)
     connection = experimenter.db_connector.connect()
     cursor = experimenter.db_connector.cursor(connection)
     cursor.execute("SELECT ID FROM test_table_config")
@@ -80,6 +74,80 @@ def test_run_all_sqlite_experiments():
     assert set(range(2, 32)) == set(entry[0] for entry in entries)
 
 
+def test_execute_more_experiments_than_open():
+    config_path = os.path.join("test", "test_run_experiments", "test_run_sqlite_experiment_config.yml")
+    experimenter = PyExperimenter(config_path, use_codecarbon=False)
+    experimenter.delete_table()
+    experimenter.fill_table_from_config()
+
+    experimenter.execute(own_function, max_experiments=7, n_jobs=1)
+    check_done_entries(experimenter, 7)
+
+    # Requesting more experiments than open ones executes all remaining experiments
+    experimenter.execute(own_function, max_experiments=40, n_jobs=1)
+    check_done_entries(experimenter, 30)
+
+
+def own_batch_function(keyfields: dict, custom_fields: dict):
+    # run the experiments of the whole batch at once for the sin and cos function
+    return {
+        "sin": np.sin(keyfields["value"]) ** keyfields["exponent"],
+        "cos": np.cos(keyfields["value"]) ** keyfields["exponent"],
+    }
+
+
+def test_execute_batch():
+    config_path = os.path.join("test", "test_run_experiments", "test_run_sqlite_experiment_config.yml")
+    experimenter = PyExperimenter(config_path, use_codecarbon=False)
+    experimenter.delete_table()
+    experimenter.fill_table_from_config()
+
+    experimenter.execute_batch(own_batch_function, batch_size=8, max_experiments=20)
+    check_done_entries(experimenter, 20)
+
+    experimenter.execute_batch(own_batch_function, batch_size=8)
+    check_done_entries(experimenter, 30)
+
+    table = experimenter.get_table()
+    assert (table["name"] == "PyExperimenter").all()
+    assert table["start_date"].notna().all() and table["end_date"].notna().all()
+    for _, row in table.iterrows():
+        assert row["sin"] == pytest.approx(sin(row["value"]) ** row["exponent"])
+        assert row["cos"] == pytest.approx(cos(row["value"]) ** row["exponent"])
+
+
+@pytest.mark.parametrize("batch_size", [0, -1])
+def test_execute_batch_invalid_batch_size(batch_size):
+    config_path = os.path.join("test", "test_run_experiments", "test_run_sqlite_experiment_config.yml")
+    experimenter = PyExperimenter(config_path, use_codecarbon=False)
+    experimenter.delete_table()
+    experimenter.fill_table_from_config()
+
+    with pytest.raises(ValueError, match="batch_size"):
+        experimenter.execute_batch(own_batch_function, batch_size=batch_size)
+    assert experimenter.status_counts() == {"created": 30}
+
+
+def error_batch_function(keyfields: dict, custom_fields: dict):
+    return {"sin": np.sin(keyfields["value"])[:1]}
+
+
+def test_execute_batch_error():
+    config_path = os.path.join("test", "test_run_experiments", "test_run_sqlite_experiment_config.yml")
+    experimenter = PyExperimenter(config_path, use_codecarbon=False)
+    experimenter.delete_table()
+    experimenter.fill_table_from_config()
+
+    experimenter.execute_batch(error_batch_function, batch_size=4, max_experiments=4)
+    assert experimenter.status_counts() == {"error": 4, "created": 26}
+
+    table = experimenter.get_table()
+    assert (table["status"][:4] == "error").all()
+    assert (table["status"][4:] == "created").all()
+    assert table["sin"].isna().all()
+    assert "Expected 4 values for result field sin, but got 1." in table["error"][0]
+
+
 def error_function(keyfields: dict, result_processor: ResultProcessor, custom_fields: dict):
     raise Exception("Error with weird symbos '@#$%&/\()=")
 
@@ -12,7 +12,7 @@ from py_experimenter.exceptions import (
     NoConfigFileError,
     ParameterCombinationError,
 )
-from py_experimenter.utils import combine_fill_table_parameters
+from py_experimenter.utils import combine_fill_table_parameters, load_credential_config, load_yaml_config
 
 
 
@@ -55,11 +55,54 @@ def test_combine_fill_table_parameters(keyfield_names, parameters, fixed_paramet
     assert expected_result == combine_fill_table_parameters(keyfield_names, parameters, fixed_parameter_combinations)
 
 
+def test_combine_fill_table_parameters_keeps_value_types():
+    # the values of one parameter list are not upcast to a common type
+    combinations = combine_fill_table_parameters(
+        ["keyfield_name_1", "keyfield_name_2"],
+        {"keyfield_name_1": [1.5, 2], "keyfield_name_2": [1, "a"]},
+    )
+
+    assert combinations == [
+        {"keyfield_name_1": 1.5, "keyfield_name_2": 1},
+        {"keyfield_name_1": 1.5, "keyfield_name_2": "a"},
+        {"keyfield_name_1": 2, "keyfield_name_2": 1},
+        {"keyfield_name_1": 2, "keyfield_name_2": "a"},
+    ]
+    assert [type(combination["keyfield_name_1"]) for combination in combinations] == [float, float, int, int]
+    assert [type(combination["keyfield_name_2"]) for combination in combinations] == [int, str, int, str]
+
+
+def test_combine_fill_table_parameters_three_keyfields_order():
+    combinations = combine_fill_table_parameters(
+        ["keyfield_name_1", "keyfield_name_2", "keyfield_name_3"],
+        {"keyfield_name_1": [1, 2], "keyfield_name_2": ["a", "b"], "keyfield_name_3": [True, False]},
+    )
+
+    assert len(combinations) == 8
+    assert combinations[:2] == [
+        {"keyfield_name_1": 1, "keyfield_name_2": "a", "keyfield_name_3": True},
+        {"keyfield_name_1": 1, "keyfield_name_2": "a", "keyfield_name_3": False},
+    ]
+
+
 @pytest.mark.parametrize(  # todo adapt test
     "keyfield_names, parameters, fixed_parameter_combinations, error_msg",
     [
         ([], {}, [], "No parameter combination found!"),
         (["keyfield_name_1"], {}, [], "No parameter combination found!"),
+        (
+            ["keyfield_name_1", "keyfield_name_2"],
+            {"keyfield_name_1": [1, 2]},
+            [{"keyfield_name_1": 3, "keyfield_name_2": 4}],
+            "There is at least one key that is used more than once!",
+        ),
+        (
+            ["keyfield_name_1", "keyfield_name_2", "keyfield_name_3"],
+            {"keyfield_name_1": [1, 2]},
+            [{"keyfield_name_2": 3, "keyfield_name_3": 4}, {"keyfield_name_2": 5}],
+            "does not match the amount of keyfields!",
+        ),
+        (["keyfield_name_1", "keyfield_name_2"], {"keyfield_name_1": [1, 2]}, [], "does not match the amount of keyfields!"),
     ],
 )
 def test_combine_fill_table_parameters_raises_error(keyfield_names, parameters, fixed_parameter_combinations, error_msg):
@@ -69,3 +112,30 @@ def test_combine_fill_table_parameters_raises_error(keyfield_names, parameters,
 
 def test_read_yaml_config():
     file_name = os.path.join("test", "test_config_files", "yml_config.yml")
+
+
+def test_load_yaml_config_is_cached():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "credentials.yml")
+        with open(path, "w") as f:
+            f.write("CREDENTIALS:\n  Database:\n    user: user\n")
+
+        config = load_yaml_config(path)
+        assert config["CREDENTIALS"]["Database"]["user"] == "user"
+
+        # Modifying the returned config must not change the cached version
+        config["CREDENTIALS"]["Database"]["user"] = "modified"
+        assert load_yaml_config(path)["CREDENTIALS"]["Database"]["user"] == "user"
+
+        with open(path, "w") as f:
+            f.write("CREDENTIALS:\n  Database:\n    user: other_user\n")
+        os.utime(path, (0, 0))
+        assert load_yaml_config(path)["CREDENTIALS"]["Database"]["user"] == "other_user"
+
+
+def test_load_credential_config():
+    path = os.path.join("test", "test_config_files", "load_config_test_file", "mysql_fake_credentials.cfg")
+    assert load_credential_config(path) == {"host": "hostname", "user": "username", "password": "afdadgnbaht3qa9"}
+
+    with pytest.raises(NoConfigFileError):
+        load_credential_config(os.path.join("test", "test_config_files", "missing_file.cfg"))